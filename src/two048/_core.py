@@ -0,0 +1,231 @@
+"""
+The core of the game, working on packed boards.
+"""
+
+from __future__ import annotations
+
+from functools import cache
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# The board is packed in a single 64 bits integer, one nibble per tile, each nibble storing log2(value) (0 for an empty tile).
+# Row 0 is stored in the most significant 16 bits, and in each row, column 0 is the most significant nibble.
+# A nibble can't go over 15, so 32768 tiles can't be merged together.
+MAX_EXPONENT = 15
+_NIBBLE_LOW = 0x7777_7777_7777_7777
+_NIBBLE_HIGH = 0x8888_8888_8888_8888
+
+
+def _reverse_row(row: int) -> int:
+    """Reverse the order of the 4 nibbles of a 16 bits row."""
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+def transpose(bits: int) -> int:
+    """Transpose a packed board, so columns can be processed as rows."""
+    a1 = bits & 0xF0F0_0F0F_F0F0_0F0F
+    a2 = bits & 0x0000_F0F0_0000_F0F0
+    a3 = bits & 0x0F0F_0000_0F0F_0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00_FF00_00FF_00FF
+    b2 = a & 0x00FF_00FF_0000_0000
+    b3 = a & 0x0000_0000_FF00_FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _build_left_tables() -> tuple[list[int], list[int]]:
+    """Compute, for every possible row, the row obtained after playing left, and the score gained."""
+    table: list[int] = [0] * 0x10000
+    scores: list[int] = [0] * 0x10000
+    for row in range(0x10000):
+        tiles = [
+            e
+            for e in ((row >> 12) & 0xF, (row >> 8) & 0xF, (row >> 4) & 0xF, row & 0xF)
+            if e != 0
+        ]
+        result: list[int] = []
+        score = 0
+        i = 0
+        while i < len(tiles):
+            if i + 1 < len(tiles) and tiles[i] == tiles[i + 1] != MAX_EXPONENT:
+                result.append(tiles[i] + 1)
+                score += 1 << (tiles[i] + 1)
+                i += 2
+            else:
+                result.append(tiles[i])
+                i += 1
+        result += [0] * (4 - len(result))
+        table[row] = (result[0] << 12) | (result[1] << 8) | (result[2] << 4) | result[3]
+        scores[row] = score
+    return table, scores
+
+
+LEFT_TABLE, LEFT_SCORE = _build_left_tables()
+# Playing right is playing left on the reversed row.
+RIGHT_TABLE = [_reverse_row(LEFT_TABLE[_reverse_row(row)]) for row in range(0x10000)]
+RIGHT_SCORE = [LEFT_SCORE[_reverse_row(row)] for row in range(0x10000)]
+
+
+def _slide_rows(bits: int, table: list[int], scores: list[int]) -> tuple[int, int]:
+    """Play each row of a packed board using a transition table.
+
+    Returns:
+        the new packed board, and the score gained
+    """
+    r0 = bits >> 48
+    r1 = (bits >> 32) & 0xFFFF
+    r2 = (bits >> 16) & 0xFFFF
+    r3 = bits & 0xFFFF
+    return (
+        (table[r0] << 48) | (table[r1] << 32) | (table[r2] << 16) | table[r3],
+        scores[r0] + scores[r1] + scores[r2] + scores[r3],
+    )
+
+
+def slide_up(bits: int) -> tuple[int, int]:
+    """Play up on a packed board. Returns the new packed board, and the score gained."""
+    new_bits, score = _slide_rows(transpose(bits), LEFT_TABLE, LEFT_SCORE)
+    return transpose(new_bits), score
+
+
+def slide_down(bits: int) -> tuple[int, int]:
+    """Play down on a packed board. Returns the new packed board, and the score gained."""
+    new_bits, score = _slide_rows(transpose(bits), RIGHT_TABLE, RIGHT_SCORE)
+    return transpose(new_bits), score
+
+
+def slide_left(bits: int) -> tuple[int, int]:
+    """Play left on a packed board. Returns the new packed board, and the score gained."""
+    return _slide_rows(bits, LEFT_TABLE, LEFT_SCORE)
+
+
+def slide_right(bits: int) -> tuple[int, int]:
+    """Play right on a packed board. Returns the new packed board, and the score gained."""
+    return _slide_rows(bits, RIGHT_TABLE, RIGHT_SCORE)
+
+
+def can_move(bits: int) -> bool:
+    """Check if any direction would change a packed board."""
+    for rows in (bits, transpose(bits)):
+        for shift in (48, 32, 16, 0):
+            row = (rows >> shift) & 0xFFFF
+            if LEFT_TABLE[row] != row or RIGHT_TABLE[row] != row:
+                return True
+    return False
+
+
+def shift_of(i: int, j: int) -> int:
+    """Get the bit offset of the nibble at the position (i, j)."""
+    return 60 - 4 * (4 * i + j)
+
+
+def empty_mask(bits: int) -> int:
+    """Get a mask where the high bit of a nibble is set only if the whole nibble is 0."""
+    return ~(((bits & _NIBBLE_LOW) + _NIBBLE_LOW) | bits) & _NIBBLE_HIGH
+
+
+def unpack(bits: int) -> list[int]:
+    """Unpack a packed board into a flat list of log2(value) (0 for an empty tile), indexed by i * 4 + j."""
+    return [(bits >> shift) & 0xF for shift in range(60, -1, -4)]
+
+
+@cache
+def _numpy_tables() -> Any:
+    """Import NumPy and build the tables used by the batch functions. Done once, on the first call."""
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError(
+            "NumPy is required to process boards in batch. Install it with pip install two048[numpy]"
+        ) from e
+
+    rows = np.arange(0x10000, dtype=np.uint64)
+    left = np.array(LEFT_TABLE, dtype=np.uint64)
+    right = np.array(RIGHT_TABLE, dtype=np.uint64)
+    tables = SimpleNamespace(
+        left=left,
+        right=right,
+        left_score=np.array(LEFT_SCORE, dtype=np.uint64),
+        right_score=np.array(RIGHT_SCORE, dtype=np.uint64),
+        # True for the rows changed by left or right.
+        movable=(left != rows) | (right != rows),
+    )
+    return np, tables
+
+
+def transpose_array(boards: np.ndarray) -> np.ndarray:
+    """Transpose an array of packed boards, converted to uint64. See transpose."""
+    np, _ = _numpy_tables()
+    u = np.uint64
+    boards = np.asarray(boards, dtype=u)
+    a1 = boards & u(0xF0F0_0F0F_F0F0_0F0F)
+    a2 = boards & u(0x0000_F0F0_0000_F0F0)
+    a3 = boards & u(0x0F0F_0000_0F0F_0000)
+    a = a1 | (a2 << u(12)) | (a3 >> u(12))
+    b1 = a & u(0xFF00_FF00_00FF_00FF)
+    b2 = a & u(0x00FF_00FF_0000_0000)
+    b3 = a & u(0x0000_0000_FF00_FF00)
+    return b1 | (b2 >> u(24)) | (b3 << u(24))
+
+
+def batch_can_move(boards: np.ndarray) -> np.ndarray:
+    """Check, for each packed board of an uint64 array, if any direction would change it. See can_move."""
+    np, tables = _numpy_tables()
+    boards = np.asarray(boards, dtype=np.uint64)
+    movable = np.zeros(boards.shape, dtype=bool)
+    for rows in (boards, transpose_array(boards)):
+        for shift in (48, 32, 16, 0):
+            movable |= tables.movable[(rows >> np.uint64(shift)) & np.uint64(0xFFFF)]
+    return movable
+
+
+def _batch_slide_rows(
+    boards: np.ndarray, table: np.ndarray, scores: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Play each row of an array of packed boards using a transition table.
+
+    Returns:
+        the new packed boards, and the score gained for each board
+    """
+    np, _ = _numpy_tables()
+    boards = np.asarray(boards, dtype=np.uint64)
+    new_boards = np.zeros_like(boards)
+    gained = np.zeros_like(boards)
+    for shift in (np.uint64(48), np.uint64(32), np.uint64(16), np.uint64(0)):
+        rows = (boards >> shift) & np.uint64(0xFFFF)
+        new_boards |= table[rows] << shift
+        gained += scores[rows]
+    return new_boards, gained
+
+
+def batch_slide_up(boards: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Play up on an array of packed boards. See slide_up."""
+    _, tables = _numpy_tables()
+    new_boards, gained = _batch_slide_rows(
+        transpose_array(boards), tables.left, tables.left_score
+    )
+    return transpose_array(new_boards), gained
+
+
+def batch_slide_down(boards: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Play down on an array of packed boards. See slide_down."""
+    _, tables = _numpy_tables()
+    new_boards, gained = _batch_slide_rows(
+        transpose_array(boards), tables.right, tables.right_score
+    )
+    return transpose_array(new_boards), gained
+
+
+def batch_slide_left(boards: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Play left on an array of packed boards. See slide_left."""
+    _, tables = _numpy_tables()
+    return _batch_slide_rows(boards, tables.left, tables.left_score)
+
+
+def batch_slide_right(boards: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Play right on an array of packed boards. See slide_right."""
+    _, tables = _numpy_tables()
+    return _batch_slide_rows(boards, tables.right, tables.right_score)
@@ -1,9 +1,28 @@
 from __future__ import annotations
 
 import random
-from collections.abc import Iterable
 from enum import Enum
-from typing import Literal
+from typing import TYPE_CHECKING, Literal
+
+from ._core import (
+    MAX_EXPONENT,
+    batch_can_move,
+    batch_slide_down,
+    batch_slide_left,
+    batch_slide_right,
+    batch_slide_up,
+    can_move,
+    empty_mask,
+    shift_of,
+    slide_down,
+    slide_left,
+    slide_right,
+    slide_up,
+    unpack,
+)
+
+if TYPE_CHECKING:
+    import numpy as np
 
 DirectionString = Literal["up", "down", "left", "right"]
 
@@ -16,11 +35,16 @@ class Direction(Enum):
 
 
 class Tile:
+    __slots__ = ("value",)
+
     def __init__(self, value: int) -> None:
         self.value = value
 
     def double(self, game: Two048 | None = None):
         """Used by the game to double the value of the tile. You should not use this function yourself."""
+        if self.value == 0:
+            # Empty tiles are shared, they must never be edited.
+            raise ValueError("Cannot double an empty tile")
         self.value *= 2
         if game is not None:
             game.score += self.value
@@ -36,72 +60,194 @@ class Tile:
         raise TypeError(f"Cannot compare Tile with {type(__o)}")
 
 
+# All the empty tiles are the same object.
+_ZERO_TILE = Tile(0)
+
+
 class Movement:
     """
     Represent a movement of a Tile.
     """
 
+    __slots__ = ("_from", "_to", "merged")
+
     def __init__(
         self, from_: tuple[int, int], to: tuple[int, int], merged: bool
     ) -> None:
-        self.from_ = from_
-        self.to = to
+        self._from = from_[0] * 4 + from_[1]
+        self._to = to[0] * 4 + to[1]
         self.merged = merged
 
+    @classmethod
+    def _from_indexes(cls, from_: int, to: int, merged: bool) -> Movement:
+        """Create a movement from flat positions (i * 4 + j), without building tuples."""
+        movement = cls.__new__(cls)
+        movement._from = from_
+        movement._to = to
+        movement.merged = merged
+        return movement
+
+    @property
+    def from_(self) -> tuple[int, int]:
+        """The position (row, column) of the tile before the movement."""
+        return divmod(self._from, 4)
+
+    @from_.setter
+    def from_(self, value: tuple[int, int]) -> None:
+        self._from = value[0] * 4 + value[1]
+
+    @property
+    def to(self) -> tuple[int, int]:
+        """The position (row, column) of the tile after the movement."""
+        return divmod(self._to, 4)
+
+    @to.setter
+    def to(self, value: tuple[int, int]) -> None:
+        self._to = value[0] * 4 + value[1]
+
     def __repr__(self) -> str:
         return f"{self.from_} move to {self.to}. Merged: {self.merged}"
 
 
-class MovementManager:
-    def __init__(self, *args: Movement) -> None:
-        self.movements: list[Movement] = list(args)
-        self.hash_find = {mvmt.to: mvmt for mvmt in self.movements}
+# Internally, directions are ints, used to index the tables below.
+_UP, _DOWN, _LEFT, _RIGHT = 0, 1, 2, 3
+_DIRECTIONS: dict[Direction | str, int] = {
+    Direction.UP: _UP,
+    Direction.DOWN: _DOWN,
+    Direction.LEFT: _LEFT,
+    Direction.RIGHT: _RIGHT,
+    "up": _UP,
+    "down": _DOWN,
+    "left": _LEFT,
+    "right": _RIGHT,
+}
+_SLIDES = (slide_up, slide_down, slide_left, slide_right)
+# For each direction, the flat positions of the rows or columns, starting from the side the tiles move to.
+_LINES = (
+    tuple((j, j + 4, j + 8, j + 12) for j in range(4)),
+    tuple((j + 12, j + 8, j + 4, j) for j in range(4)),
+    tuple((i * 4, i * 4 + 1, i * 4 + 2, i * 4 + 3) for i in range(4)),
+    tuple((i * 4 + 3, i * 4 + 2, i * 4 + 1, i * 4) for i in range(4)),
+)
+_BATCH_SLIDES = (batch_slide_up, batch_slide_down, batch_slide_left, batch_slide_right)
+
+
+def _direction_index(direction: Direction | DirectionString) -> int:
+    """Convert a direction given by the user to its internal int."""
+    if (index := _DIRECTIONS.get(direction)) is None:
+        raise ValueError(f"{direction!r} is not a valid Direction")
+    return index
+
+
+def _lines_movements(
+    board: list[int], lines: tuple[tuple[int, int, int, int], ...]
+) -> list[Movement]:
+    """Compute in a single pass per line the movements made when the lines are played.
+    Each tile gets at most one movement, from its start to its destination.
+
+    Args:
+        board: the unpacked board
+        lines: the flat positions of each line, starting from the side the tiles move to
+
+    Returns:
+        the list of movements made
+    """
+    movements: list[Movement] = []
+    append = movements.append
+    new_movement = Movement._from_indexes
+    for line in lines:
+        target = 0  # Where the next tile will go in the line.
+        mergeable = 0  # The tile before target, if it can still be merged.
+        for k, pos in enumerate(line):
+            exponent = board[pos]
+            if exponent == 0:
+                continue
+            if exponent == mergeable != MAX_EXPONENT:
+                append(new_movement(pos, line[target - 1], True))
+                mergeable = 0
+            else:
+                if k != target:
+                    append(new_movement(pos, line[target], False))
+                mergeable = exponent
+                target += 1
+    return movements
 
-    def add_movement(self, value: Movement) -> None:
-        """Add a new movement in the current set of movements.
-        Each tiles should only have one movement, from the start to the destination. No "sequenced" movements.
 
-        Args:
-            value: The movement to append.
-        """
-        if (tile := self.hash_find.get(value.from_, None)) is not None:
-            # If a movement exist already (i.e. it is sequenced), edit the already stored movement.
-            tile.to = value.to
-            tile.merged = value.merged
-        else:
-            self.movements.append(value)
-            self.hash_find[value.to] = value
-
-    def add_movements(self, values: Iterable[Movement]) -> None:
-        """Add a list of movements. See add_movement for more details.
+# Used by Two048.__repr__, the cells are indexed by log2(value).
+_CELLS = tuple(f"{1 << e:^5}" if e else " " * 5 for e in range(16))
+_SEPARATOR = "|-------------------------------|"
+_BOTTOM = "⌞_______________________________」⌟"
 
-        Args:
-            values: An stack of movements.
-        """
-        for move in values:
-            self.add_movement(move)
 
-    def __repr__(self) -> str:
-        return "\n".join(str(move) for move in self.movements)
+class Two048:
+    """
+    A game of 2048. The board is packed in board_bits, one nibble per tile storing log2(value).
 
-    def __bool__(self) -> bool:
-        return self.movements != []
+    Because of this, the biggest tile is 32768 : two 32768 tiles don't merge,
+    so is_over can report a gameover on a board where they could.
+    """
 
+    __slots__ = ("score", "moves", "board_bits")
 
-class Two048:
     score: int
     moves: int
-    board: list[list[Tile]]
+    board_bits: int
 
     def __init__(self) -> None:
         self.reset()
         self.spawn_tile()
 
+    @property
+    def board(self) -> list[list[Tile]]:
+        """The board as a list of rows of tiles. The tiles are built on access : editing them has no effect on the game."""
+        exponents = unpack(self.board_bits)
+        return [
+            [
+                Tile(1 << e) if (e := exponents[i * 4 + j]) else _ZERO_TILE
+                for j in range(4)
+            ]
+            for i in range(4)
+        ]
+
+    @board.setter
+    def board(self, board: list[list[Tile]]) -> None:
+        if len(board) != 4 or any(len(row) != 4 for row in board):
+            raise ValueError("The board must have 4 rows of 4 tiles")
+        bits = 0
+        for i, row in enumerate(board):
+            for j, tile in enumerate(row):
+                value = tile.value
+                if value == 0:
+                    continue
+                exponent = value.bit_length() - 1
+                if (
+                    value < 0
+                    or value != 1 << exponent
+                    or not 1 <= exponent <= MAX_EXPONENT
+                ):
+                    raise ValueError(
+                        f"Invalid tile {value} at {(i, j)}: must be 0 or a power of 2 from 2 to {1 << MAX_EXPONENT}"
+                    )
+                bits |= exponent << shift_of(i, j)
+        self.board_bits = bits
+
     def reset(self):
         """Reset the game"""
         self.score = 0
         self.moves = 0
-        self.board = self.generate_empty_board()
+        self.board_bits = 0
+
+    def clone(self) -> Two048:
+        """Get a copy of the game, without building any tile. Useful to explore the next moves.
+
+        Returns:
+            A new game, with the same board, score and moves.
+        """
+        game = self.__class__.__new__(self.__class__)
+        game.score = self.score
+        game.moves = self.moves
+        game.board_bits = self.board_bits
+        return game
 
     def generate_empty_board(self) -> list[list[Tile]]:
         """Generate an empty board.
@@ -109,7 +255,7 @@ class Two048:
         Returns:
             A new empty board filled with Tile(0)
         """
-        return [[Tile(0) for _ in range(4)] for __ in range(4)]
+        return [[_ZERO_TILE] * 4 for _ in range(4)]
 
     def get_empty_positions(self) -> list[tuple[int, int]]:
         """Get a list of the empty positions. This is managed by the game : you should not use it.
@@ -117,39 +263,69 @@ class Two048:
         Returns:
             A list of empty positions
         """
+        mask = empty_mask(self.board_bits)
         return [
-            (i, j) for i in range(4) for j in range(4) if self.board[i][j].value == 0
+            (i, j)
+            for i in range(4)
+            for j in range(4)
+            if mask >> (shift_of(i, j) + 3) & 1
         ]
 
     def spawn_tile(self):
         """Spawn a new tile on the board. This is managed by the game : you should not use it."""
-        valid_positions: list[tuple[int, int]] = self.get_empty_positions()
-        spawn_position = random.choice(valid_positions)
-        (new_tile,) = random.sample([Tile(2), Tile(4)], counts=[9, 1], k=1)
-        self.board[spawn_position[0]][spawn_position[1]] = new_tile
-
-    def play(self, direction: Direction | DirectionString) -> list[Movement]:
+        mask = empty_mask(self.board_bits)
+        # Drop a random number of empty nibbles, then spawn on the lowest remaining one.
+        for _ in range(random.randrange(mask.bit_count())):
+            mask &= mask - 1
+        spawn_bit = mask & -mask
+        # A 2 (log2 = 1) for 90% of the spawns, a 4 (log2 = 2) otherwise.
+        exponent = 1 if random.random() < 0.9 else 2
+        self.board_bits |= exponent << (spawn_bit.bit_length() - 4)
+
+    def play(
+        self, direction: Direction | DirectionString, emit_movements: bool = True
+    ) -> list[Movement]:
         """Use this fonction to play the game. Use a direction with Direction or "up", "down", "left", "right".
+        The biggest tile is 32768 : two 32768 tiles don't merge.
 
         Args:
             direction: The direction you want to play. Can be "up", "down", "left" or "right", or a Direction enum.
+            emit_movements: If False, the movements are not computed and an empty list is returned. Faster if you don't need them.
 
         Returns:
             The list of movements made. Including merges. Useful if you need to do animations.
         """
-        if isinstance(direction, str):
-            direction = Direction(direction)
+        index = _direction_index(direction)
+        bits = self.board_bits
+        moved, _ = self._step(index)
+        if not moved or not emit_movements:
+            return []
+
+        # The new board is already computed, the movements are rebuilt from the previous one.
+        return _lines_movements(unpack(bits), _LINES[index])
 
-        movements_manager = MovementManager()
-        movements_manager.add_movements(self._move_without_merge(direction))
-        movements_manager.add_movements(self._merge(direction))
-        movements_manager.add_movements(self._move_without_merge(direction))
+    def step(self, direction: Direction | DirectionString) -> tuple[bool, int]:
+        """Same as play, but the movements are not computed. Faster if you don't need them.
 
-        if movements_manager:
-            self.spawn_tile()
-            self.moves += 1
+        Args:
+            direction: The direction you want to play. Can be "up", "down", "left" or "right", or a Direction enum.
+
+        Returns:
+            If the board changed, and the score gained.
+        """
+        return self._step(_direction_index(direction))
+
+    def _step(self, index: int) -> tuple[bool, int]:
+        """Implementation of step, with the direction already converted to its int."""
+        new_bits, score = _SLIDES[index](self.board_bits)
+        if new_bits == self.board_bits:
+            return False, 0
 
-        return movements_manager.movements
+        self.board_bits = new_bits
+        self.score += score
+        self.spawn_tile()
+        self.moves += 1
+        return True, score
 
     def is_over(self) -> bool:
         """To know if then game is over
@@ -157,147 +333,50 @@ class Two048:
         Returns:
             True if it is gameover, False otherwise.
         """
-        for direction in Direction:
-            if (
-                len(self._move_without_merge(direction, False)) != 0
-                or len(self._merge(direction, False)) != 0
-            ):
-                return False
-        return True
+        return not can_move(self.board_bits)
 
-    def _apply_movements(self, movements: Iterable[Movement]):
-        """Apply a list of movements to the board.
+    @staticmethod
+    def batch_is_over(boards: np.ndarray) -> np.ndarray:
+        """Same as is_over, for many boards at once. Useful to run a lot of games in parallel. Requires NumPy.
 
         Args:
-            movements: A list of movements
-        """
-        for mvmt in movements:
-            if mvmt.merged:
-                self.board[mvmt.to[0]][mvmt.to[1]].double(self)
-                self.board[mvmt.from_[0]][mvmt.from_[1]] = Tile(0)
-            else:
-                self.board[mvmt.to[0]][mvmt.to[1]] = self.board[mvmt.from_[0]][
-                    mvmt.from_[1]
-                ]
-                self.board[mvmt.from_[0]][mvmt.from_[1]] = Tile(0)
-
-    def _move_without_merge(
-        self, direction: Direction, apply: bool = True
-    ) -> list[Movement]:
-        """Move the tiles within the direction given, without merging them.
-        Return a list of the movements made.
-
-        Args:
-            direction: the direction to move
-            apply: if the board should be edited or not. Allow to check if the game is ended.
+            boards: An array of packed boards (see board_bits), converted to uint64.
 
         Returns:
-            the list of movements made
+            An array of booleans, True where the board is gameover.
         """
-        match direction:
-            case Direction.UP:
-                ordered_check = ((j, i, j) for j in range(4) for i in range(4))
-
-                def new_pos(i: int, j: int, av: int):
-                    return (i - av, j)
-
-            case Direction.DOWN:
-                ordered_check = ((j, i, j) for j in range(4) for i in range(3, -1, -1))
+        return ~batch_can_move(boards)
 
-                def new_pos(i: int, j: int, av: int):
-                    return (i + av, j)
-
-            case Direction.LEFT:
-                ordered_check = ((i, i, j) for i in range(4) for j in range(4))
-
-                def new_pos(i: int, j: int, av: int):
-                    return (i, j - av)
-
-            case Direction.RIGHT:
-                ordered_check = ((i, i, j) for i in range(4) for j in range(3, -1, -1))
-
-                def new_pos(i: int, j: int, av: int):
-                    return (i, j + av)
-
-        movements: list[Movement] = []
-        available_moves: list[int] = [0] * 4
-
-        for cl, i, j in ordered_check:
-            if self.board[i][j].value == 0:
-                available_moves[cl] += 1
-            else:
-                if available_moves[cl] != 0:
-                    movements.append(
-                        Movement((i, j), new_pos(i, j, available_moves[cl]), False)
-                    )
-
-        if apply:
-            self._apply_movements(movements)
-        return movements
-
-    def _merge(self, direction: Direction, apply: bool = True) -> list[Movement]:
-        """Merge the tiles within the direction given. Hole may be present after merge. It is necessary to call _move_without_merge after this function.
-        Return a list of the movements made.
+    @staticmethod
+    def batch_step(
+        boards: np.ndarray, direction: Direction | DirectionString
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Play a direction on many boards at once. Requires NumPy.
+        Unlike step, no tile is spawned : the boards are only slid.
 
         Args:
-            direction: the direction to merge
-            apply: if the board should be edited or not. Allow to check if the game is ended.
-
+            boards: An array of packed boards (see board_bits), converted to uint64.
+            direction: The direction you want to play. Can be "up", "down", "left" or "right", or a Direction enum.
 
         Returns:
-            the list of movements made
+            The array of new packed boards, and the array of score gained by each board.
         """
-        match direction:
-            case Direction.UP:
-                ordered_check = (((i, j) for i in range(4)) for j in range(4))
-            case Direction.DOWN:
-                ordered_check = (((i, j) for i in range(3, -1, -1)) for j in range(4))
-            case Direction.LEFT:
-                ordered_check = (((i, j) for j in range(4)) for i in range(4))
-            case Direction.RIGHT:
-                ordered_check = (((i, j) for j in range(3, -1, -1)) for i in range(4))
-
-        movements: list[Movement] = []
-        for group in ordered_check:
-            prev: tuple[int, int] | None = None
-            moved: bool = False
-            for i, j in group:
-                if prev is None:
-                    prev = (i, j)
-                    continue
-                if not moved and self.board[prev[0]][prev[1]] == self.board[i][j] != 0:
-                    movements.append(Movement((i, j), prev, True))
-                    moved = True
-                else:
-                    moved = False
-                prev = (i, j)
-
-        if apply:
-            self._apply_movements(movements)
-
-        return movements
+        return _BATCH_SLIDES[_direction_index(direction)](boards)
 
     def __repr__(self) -> str:
-        display = (
-            "Score : {score}\n"
-            "|-------------------------------|\n"
-            "| {:^5} | {:^5} | {:^5} | {:^5} |\n"
-            "|-------------------------------|\n"
-            "| {:^5} | {:^5} | {:^5} | {:^5} |\n"
-            "|-------------------------------|\n"
-            "| {:^5} | {:^5} | {:^5} | {:^5} |\n"
-            "|-------------------------------|\n"
-            "| {:^5} | {:^5} | {:^5} | {:^5} |\n"
-            "⌞_______________________________」⌟\n"
-        ).format(
-            score=self.score,
-            *[
-                (tile.value if tile.value != 0 else "")
-                for row in self.board
-                for tile in row
-            ],
-        )
-        return display
+        bits = self.board_bits
+        lines = [f"Score : {self.score}"]
+        for shift in (48, 32, 16, 0):
+            a, b, c, d = (
+                _CELLS[(bits >> (shift + 12)) & 0xF],
+                _CELLS[(bits >> (shift + 8)) & 0xF],
+                _CELLS[(bits >> (shift + 4)) & 0xF],
+                _CELLS[(bits >> shift) & 0xF],
+            )
+            lines.append(_SEPARATOR)
+            lines.append(f"| {a} | {b} | {c} | {d} |")
+        lines.append(_BOTTOM)
+        return "\n".join(lines) + "\n"
 
 
 if __name__ == "__main__":
@@ -311,7 +390,7 @@ if __name__ == "__main__":
             "\x1b[D": Direction.LEFT,
             "\x1b[C": Direction.RIGHT,
         }[input("Direction : ")]
-        game.play(direction)
+        game.step(direction)
 
     print(game)
     print("Game over ! Score :", game.score)
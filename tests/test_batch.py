@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from two048 import Direction, Two048
+from two048._core import can_move, slide_down, slide_left, slide_right, slide_up
+
+np = pytest.importorskip("numpy")
+
+
+def random_boards(count: int, seed: int) -> list[int]:
+    """Get packed boards of games played randomly, with up to 128 on the first tile so they fit in an int64."""
+    rng = random.Random(seed)
+    boards: list[int] = []
+    while len(boards) < count:
+        game = Two048()
+        for _ in range(rng.randrange(150)):
+            game.step(rng.choice(list(Direction)))
+        if game.board_bits >> 63 == 0:
+            boards.append(game.board_bits)
+    return boards
+
+
+@pytest.mark.parametrize("direction", list(Direction))
+def test_batch_step_input_types(direction: Direction):
+    boards = random_boards(200, seed=0)
+    expected_boards, expected_scores = Two048.batch_step(
+        np.array(boards, dtype=np.uint64), direction
+    )
+    for boards_input in (boards, np.array(boards, dtype=np.int64)):
+        new_boards, scores = Two048.batch_step(boards_input, direction)
+        assert new_boards.dtype == np.uint64
+        assert (new_boards == expected_boards).all()
+        assert (scores == expected_scores).all()
+
+
+def test_batch_is_over_input_types():
+    boards = random_boards(200, seed=1)
+    expected = Two048.batch_is_over(np.array(boards, dtype=np.uint64))
+    for boards_input in (boards, np.array(boards, dtype=np.int64)):
+        assert (Two048.batch_is_over(boards_input) == expected).all()
+
+
+@pytest.mark.parametrize(
+    "direction, slide",
+    [
+        (Direction.UP, slide_up),
+        (Direction.DOWN, slide_down),
+        (Direction.LEFT, slide_left),
+        (Direction.RIGHT, slide_right),
+    ],
+)
+def test_batch_step_matches_slides(direction: Direction, slide):
+    boards = random_boards(1000, seed=2) + [
+        0xFFEE_DDCC_1111_2222,
+        0x8800_0000_0000_0088,
+    ]
+    new_boards, scores = Two048.batch_step(np.array(boards, dtype=np.uint64), direction)
+    assert [(int(board), int(score)) for board, score in zip(new_boards, scores)] == [
+        slide(board) for board in boards
+    ]
+
+
+def test_batch_is_over_matches_can_move():
+    boards = random_boards(1000, seed=3) + [
+        0x1212_2121_1212_2121,
+        0xF1F2_2F1F_F1F2_2F1F,
+    ]
+    over = Two048.batch_is_over(np.array(boards, dtype=np.uint64))
+    assert list(over) == [not can_move(board) for board in boards]
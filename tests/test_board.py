@@ -0,0 +1,38 @@
+import pytest
+
+from two048 import Tile, Two048
+
+
+def make_board(values: list[list[int]]) -> list[list[Tile]]:
+    return [[Tile(value) for value in row] for row in values]
+
+
+def test_board_round_trip():
+    values = [
+        [0, 2, 4, 8],
+        [16, 32, 64, 128],
+        [256, 512, 1024, 2048],
+        [4096, 8192, 16384, 32768],
+    ]
+    game = Two048()
+    game.board = make_board(values)
+    assert game.board_bits == 0x0123_4567_89AB_CDEF
+    assert [[tile.value for tile in row] for row in game.board] == values
+
+
+@pytest.mark.parametrize("value", [1, 3, 6, 65536, -2])
+@pytest.mark.parametrize("position", [(0, 0), (0, 1), (3, 3)])
+def test_board_invalid_tile(value: int, position: tuple[int, int]):
+    values = [[0] * 4 for _ in range(4)]
+    values[position[0]][position[1]] = value
+    game = Two048()
+    bits = game.board_bits
+    with pytest.raises(ValueError):
+        game.board = make_board(values)
+    assert game.board_bits == bits
+
+
+@pytest.mark.parametrize("values", [[[0] * 4] * 3, [[0] * 5] * 4])
+def test_board_invalid_shape(values: list[list[int]]):
+    with pytest.raises(ValueError):
+        Two048().board = make_board(values)
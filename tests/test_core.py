@@ -0,0 +1,118 @@
+import random
+
+import pytest
+
+from two048._core import (
+    LEFT_SCORE,
+    LEFT_TABLE,
+    MAX_EXPONENT,
+    RIGHT_SCORE,
+    RIGHT_TABLE,
+    can_move,
+    slide_down,
+    slide_left,
+    slide_right,
+    slide_up,
+    transpose,
+    unpack,
+)
+
+
+def reference_left(line: list[int]) -> tuple[list[int], int]:
+    """Play a line of log2 values to the left, the straightforward way."""
+    tiles = [e for e in line if e != 0]
+    result: list[int] = []
+    score = 0
+    while tiles:
+        if len(tiles) > 1 and tiles[0] == tiles[1] != MAX_EXPONENT:
+            result.append(tiles[0] + 1)
+            score += 2 ** (tiles[0] + 1)
+            tiles = tiles[2:]
+        else:
+            result.append(tiles.pop(0))
+    return result + [0] * (4 - len(result)), score
+
+
+def reference_slide(
+    grid: list[list[int]], direction: str
+) -> tuple[list[list[int]], int]:
+    """Play a 4x4 grid of log2 values, by rotating it so the direction is left."""
+    if direction in ("up", "down"):
+        grid = [list(column) for column in zip(*grid)]
+    if direction in ("down", "right"):
+        grid = [row[::-1] for row in grid]
+    rows, scores = zip(*(reference_left(row) for row in grid))
+    result = list(rows)
+    if direction in ("down", "right"):
+        result = [row[::-1] for row in result]
+    if direction in ("up", "down"):
+        result = [list(column) for column in zip(*result)]
+    return result, sum(scores)
+
+
+def pack(grid: list[list[int]]) -> int:
+    bits = 0
+    for e in (e for row in grid for e in row):
+        bits = (bits << 4) | e
+    return bits
+
+
+def grid_of(bits: int) -> list[list[int]]:
+    exponents = unpack(bits)
+    return [[exponents[i * 4 + j] for j in range(4)] for i in range(4)]
+
+
+def random_grids(count: int, seed: int) -> list[list[list[int]]]:
+    rng = random.Random(seed)
+    return [
+        [[rng.choice([0, 0, 0, 1, 1, 2, 3, 4, 15]) for _ in range(4)] for _ in range(4)]
+        for _ in range(count)
+    ]
+
+
+def row_of(line: list[int]) -> int:
+    return (line[0] << 12) | (line[1] << 8) | (line[2] << 4) | line[3]
+
+
+def test_row_tables():
+    for row in range(0x10000):
+        line = [(row >> 12) & 0xF, (row >> 8) & 0xF, (row >> 4) & 0xF, row & 0xF]
+        left, left_score = reference_left(line)
+        assert LEFT_TABLE[row] == row_of(left)
+        assert LEFT_SCORE[row] == left_score
+        right, right_score = reference_left(line[::-1])
+        assert RIGHT_TABLE[row] == row_of(right[::-1])
+        assert RIGHT_SCORE[row] == right_score
+
+
+def test_max_exponent_does_not_merge():
+    assert LEFT_TABLE[0xFF00] == 0xFF00
+    assert LEFT_TABLE[0xEE00] == 0xF000
+
+
+@pytest.mark.parametrize(
+    "direction, slide",
+    [
+        ("up", slide_up),
+        ("down", slide_down),
+        ("left", slide_left),
+        ("right", slide_right),
+    ],
+)
+def test_slides(direction, slide):
+    for grid in random_grids(2000, seed=0):
+        expected, score = reference_slide(grid, direction)
+        assert slide(pack(grid)) == (pack(expected), score)
+
+
+def test_transpose():
+    for grid in random_grids(200, seed=1):
+        assert grid_of(transpose(pack(grid))) == [list(column) for column in zip(*grid)]
+
+
+def test_can_move():
+    for grid in random_grids(2000, seed=2):
+        expected = any(
+            reference_slide(grid, d)[0] != grid for d in ("up", "down", "left", "right")
+        )
+        assert can_move(pack(grid)) == expected
@@ -0,0 +1,107 @@
+import random
+
+import pytest
+
+from two048 import Direction, Tile, Two048
+
+
+def make_game(values: list[list[int]]) -> Two048:
+    game = Two048()
+    game.board = [[Tile(value) for value in row] for row in values]
+    return game
+
+
+def movements_of(
+    game: Two048, direction: str
+) -> set[tuple[tuple[int, int], tuple[int, int], bool]]:
+    return {(mvmt.from_, mvmt.to, mvmt.merged) for mvmt in game.play(direction)}
+
+
+@pytest.mark.parametrize(
+    "values, direction, expected",
+    [
+        (
+            [[2, 2, 2, 2], [0] * 4, [0] * 4, [0] * 4],
+            "left",
+            {((0, 1), (0, 0), True), ((0, 2), (0, 1), False), ((0, 3), (0, 1), True)},
+        ),
+        (
+            [[2, 2, 2, 2], [0] * 4, [0] * 4, [0] * 4],
+            "right",
+            {((0, 2), (0, 3), True), ((0, 1), (0, 2), False), ((0, 0), (0, 2), True)},
+        ),
+        (
+            [[2, 0, 0, 0], [2, 0, 0, 0], [4, 0, 0, 0], [4, 0, 0, 0]],
+            "up",
+            {((1, 0), (0, 0), True), ((2, 0), (1, 0), False), ((3, 0), (1, 0), True)},
+        ),
+        (
+            [[2, 0, 0, 0], [2, 0, 0, 0], [4, 0, 0, 0], [4, 0, 0, 0]],
+            "down",
+            {((2, 0), (3, 0), True), ((1, 0), (2, 0), False), ((0, 0), (2, 0), True)},
+        ),
+        (
+            [[0, 4, 0, 4], [0] * 4, [0] * 4, [0] * 4],
+            "left",
+            {((0, 1), (0, 0), False), ((0, 3), (0, 0), True)},
+        ),
+    ],
+)
+def test_double_merge_movements(values, direction, expected):
+    assert movements_of(make_game(values), direction) == expected
+
+
+def test_movements_rebuild_the_board():
+    rng = random.Random(0)
+    for _ in range(2000):
+        values = [[rng.choice([0, 0, 0, 2, 4, 8]) for _ in range(4)] for _ in range(4)]
+        game = make_game(values)
+        bits = game.board_bits
+        direction = rng.choice(list(Direction))
+        movements = game.play(direction)
+        if game.board_bits == bits:
+            assert movements == []
+            continue
+
+        sources = [mvmt.from_ for mvmt in movements]
+        assert len(sources) == len(set(sources))
+        rebuilt = [[0] * 4 for _ in range(4)]
+        for i in range(4):
+            for j in range(4):
+                if (i, j) not in sources:
+                    rebuilt[i][j] += values[i][j]
+        for mvmt in movements:
+            rebuilt[mvmt.to[0]][mvmt.to[1]] += values[mvmt.from_[0]][mvmt.from_[1]]
+
+        # The board also contains the spawned tile.
+        board = [[tile.value for tile in row] for row in game.board]
+        differences = [
+            (i, j) for i in range(4) for j in range(4) if board[i][j] != rebuilt[i][j]
+        ]
+        assert len(differences) == 1
+        i, j = differences[0]
+        assert rebuilt[i][j] == 0 and board[i][j] in (2, 4)
+
+
+def test_repr():
+    game = make_game(
+        [
+            [0, 2, 4, 8],
+            [16, 32, 64, 128],
+            [256, 512, 1024, 2048],
+            [4096, 8192, 16384, 32768],
+        ]
+    )
+    game.score = 1234
+    assert repr(game) == (
+        "Score : 1234\n"
+        "|-------------------------------|\n"
+        "|       |   2   |   4   |   8   |\n"
+        "|-------------------------------|\n"
+        "|  16   |  32   |  64   |  128  |\n"
+        "|-------------------------------|\n"
+        "|  256  |  512  | 1024  | 2048  |\n"
+        "|-------------------------------|\n"
+        "| 4096  | 8192  | 16384 | 32768 |\n"
+        "⌞_______________________________」⌟\n"
+    )